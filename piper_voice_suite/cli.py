@@ -1,4 +1,6 @@
 from __future__ import annotations
+from pathlib import Path
+from typing import Optional
 import typer
 from rich import print as rprint
 
@@ -8,6 +10,8 @@ from .studio import run_studio
 from .dataset import build_ljspeech_dataset, validate_dataset
 from .train import train_voice
 from .export import export_onnx
+from .storage import export_wav_dataset, benchmark_storage
+from .serve import run_serve
 
 app = typer.Typer(add_completion=False, help="Piper Voice Creator / Trainer Suite")
 
@@ -38,6 +42,23 @@ def dataset_validate(config: str = typer.Option(..., "--config", "-c")):
     validate_dataset(cfg)
 
 
+@dataset_app.command("export-wav")
+def dataset_export_wav(
+    config: str = typer.Option(..., "--config", "-c"),
+    out: Optional[str] = typer.Option(None, "--out", help="Defaults to <dataset_dir>_wav"),
+):
+    """Decode a FLAC/packed dataset into a plain LJSpeech WAV tree."""
+    cfg = load_config(config)
+    export_wav_dataset(cfg, out_dir=Path(out).expanduser().resolve() if out else None)
+
+
+@dataset_app.command("bench-storage")
+def dataset_bench_storage(config: str = typer.Option(..., "--config", "-c")):
+    """Report compression ratio and decode throughput of takes and dataset audio."""
+    cfg = load_config(config)
+    benchmark_storage(cfg)
+
+
 @app.command()
 def train(config: str = typer.Option(..., "--config", "-c")):
     """Run/launch training using an external training repo."""
@@ -52,4 +73,16 @@ def export(config: str = typer.Option(..., "--config", "-c"), checkpoint_dir: st
     cfg = load_config(config)
     onnx_path, meta_path = export_onnx(cfg, checkpoint_dir=Path(checkpoint_dir).expanduser().resolve())
     rprint(f"[green]ONNX:[/green] {onnx_path}")
-    rprint(f"[green]META:[/green] {meta_path}")
\ No newline at end of file
+    rprint(f"[green]META:[/green] {meta_path}")
+
+
+@app.command()
+def serve(
+    config: str = typer.Option(..., "--config", "-c"),
+    model_dir: Optional[str] = typer.Option(None, "--model-dir", help="Defaults to <out_dir>/<voice_id>"),
+    host: str = "127.0.0.1",
+    port: int = 7861,
+):
+    """Serve an exported voice over HTTP for preview/QA (CPU only)."""
+    cfg = load_config(config)
+    run_serve(cfg, model_dir=Path(model_dir).expanduser().resolve() if model_dir else None, host=host, port=port)
\ No newline at end of file
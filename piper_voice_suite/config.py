@@ -27,6 +27,18 @@ class AudioCfg:
     target_format: str = "wav"
     normalize: bool = True
     trim_silence: bool = True
+    storage: str = "wav"
+    pack: bool = False
+
+
+@dataclass(frozen=True)
+class TextCfg:
+    cache_path: Path
+    normalize: bool = True
+    phonemize: bool = False
+    phoneme_backend: str = "piper"
+    batch_size: int = 64
+    workers: int = 4
 
 
 @dataclass(frozen=True)
@@ -45,6 +57,15 @@ class ExportCfg:
     simplify_onnx: bool = True
 
 
+@dataclass(frozen=True)
+class ServeCfg:
+    sessions: int = 2
+    threads_per_session: int = 1
+    max_batch: int = 8
+    batch_wait_ms: float = 5.0
+    cache_mb: int = 256
+
+
 @dataclass(frozen=True)
 class SuiteConfig:
     voice_id: str
@@ -53,8 +74,10 @@ class SuiteConfig:
     paths: Paths
     prompts: PromptsCfg
     audio: AudioCfg
+    text: TextCfg
     training: TrainingCfg
     export: ExportCfg
+    serve: ServeCfg
 
 
 def _p(v: Any) -> Path:
@@ -72,15 +95,19 @@ def load_config(path: str | Path) -> SuiteConfig:
     paths = data["paths"]
     prompts = data["prompts"]
     audio = data.get("audio", {})
+    text = data.get("text", {})
     training = data["training"]
     export = data.get("export", {})
+    serve = data.get("serve", {})
+
+    work_dir = _p(paths["work_dir"])
 
     return SuiteConfig(
         voice_id=voice_id,
         language=language,
         sample_rate=sample_rate,
         paths=Paths(
-            work_dir=_p(paths["work_dir"]),
+            work_dir=work_dir,
             recordings_dir=_p(paths["recordings_dir"]),
             dataset_dir=_p(paths["dataset_dir"]),
             out_dir=_p(paths["out_dir"]),
@@ -96,6 +123,16 @@ def load_config(path: str | Path) -> SuiteConfig:
             target_format=str(audio.get("target_format", "wav")),
             normalize=bool(audio.get("normalize", True)),
             trim_silence=bool(audio.get("trim_silence", True)),
+            storage=str(audio.get("storage", "wav")),
+            pack=bool(audio.get("pack", False)),
+        ),
+        text=TextCfg(
+            cache_path=_p(text["cache_path"]) if text.get("cache_path") else work_dir / "cache" / "text.sqlite",
+            normalize=bool(text.get("normalize", True)),
+            phonemize=bool(text.get("phonemize", False)),
+            phoneme_backend=str(text.get("phoneme_backend", "piper")),
+            batch_size=int(text.get("batch_size", 64)),
+            workers=int(text.get("workers", 4)),
         ),
         training=TrainingCfg(
             training_repo_path=_p(training["training_repo_path"]),
@@ -109,4 +146,11 @@ def load_config(path: str | Path) -> SuiteConfig:
             onnx_opset=int(export.get("onnx_opset", 17)),
             simplify_onnx=bool(export.get("simplify_onnx", True)),
         ),
+        serve=ServeCfg(
+            sessions=int(serve.get("sessions", 2)),
+            threads_per_session=int(serve.get("threads_per_session", 1)),
+            max_batch=int(serve.get("max_batch", 8)),
+            batch_wait_ms=float(serve.get("batch_wait_ms", 5.0)),
+            cache_mb=int(serve.get("cache_mb", 256)),
+        ),
     )
\ No newline at end of file
@@ -1,10 +1,13 @@
 from __future__ import annotations
 import csv
+import shutil
 from pathlib import Path
 from typing import Iterable, Tuple
 
 from .config import SuiteConfig
 from .deps import assert_deps
+from .storage import AUDIO_EXTS, PACK_NAME, audio_ext, dataset_audio_index, list_takes, pack_dir, require_zstd
+from .text import process_texts
 from .utils import ensure_dir, run, CmdError, read_lines
 
 
@@ -21,6 +24,9 @@ def _ffmpeg_process(in_wav: Path, out_wav: Path, sr: int, ch: int, normalize: bo
     cmd = ["ffmpeg", "-y", "-i", str(in_wav), "-ac", str(ch), "-ar", str(sr)]
     if filters:
         cmd += ["-af", ",".join(filters)]
+    if out_wav.suffix == ".flac":
+        # loudnorm emits float samples; keep FLAC at 16-bit like the PCM wavs.
+        cmd += ["-sample_fmt", "s16"]
     cmd += [str(out_wav)]
     run(cmd)
 
@@ -29,11 +35,12 @@ def build_ljspeech_dataset(cfg: SuiteConfig) -> None:
     """
     Builds:
       dataset_dir/
-        wavs/000001.wav ...
-        metadata.csv  (LJSpeech format: <id>|<text>|<text>)
+        wavs/000001.wav ...  (.flac with audio.storage: flac; packed into wavs.tar.zst with audio.pack)
+        metadata.csv  (LJSpeech format: <id>|<raw text>|<normalized text>)
+        metadata_phonemes.csv  (<id>|<phonemes>, only with text.phonemize)
     Inputs expected:
       recordings_dir/
-        takes/<idx>.wav
+        takes/<idx>.wav|.flac
         takes/<idx>.txt  (same idx, contains transcript)
     """
     assert_deps()
@@ -45,12 +52,16 @@ def build_ljspeech_dataset(cfg: SuiteConfig) -> None:
     if not takes_dir.exists():
         raise RuntimeError(f"No recordings found at: {takes_dir}")
 
+    ext = audio_ext(cfg)
+    if cfg.audio.pack:
+        require_zstd()
+
     # Collect takes by idx
-    wav_files = sorted(takes_dir.glob("*.wav"))
+    wav_files = list_takes(takes_dir)
     if not wav_files:
-        raise RuntimeError(f"No .wav takes found in: {takes_dir}")
+        raise RuntimeError(f"No .wav/.flac takes found in: {takes_dir}")
 
-    rows: list[Tuple[str, str, str]] = []
+    items: list[Tuple[str, str]] = []
     for wav in wav_files:
         stem = wav.stem
         txt = takes_dir / f"{stem}.txt"
@@ -62,7 +73,10 @@ def build_ljspeech_dataset(cfg: SuiteConfig) -> None:
             raise RuntimeError(f"Empty transcript for take {stem}")
 
         out_id = f"{int(stem):06d}"
-        out_wav = wavs_dir / f"{out_id}.wav"
+        out_wav = wavs_dir / f"{out_id}{ext}"
+        for stale_ext in AUDIO_EXTS:
+            if stale_ext != ext:
+                (wavs_dir / f"{out_id}{stale_ext}").unlink(missing_ok=True)
         _ffmpeg_process(
             wav, out_wav,
             sr=cfg.audio.target_sr,
@@ -70,26 +84,45 @@ def build_ljspeech_dataset(cfg: SuiteConfig) -> None:
             normalize=cfg.audio.normalize,
             trim_silence=cfg.audio.trim_silence
         )
-        rows.append((out_id, text, text))
+        items.append((out_id, text))
+
+    normalized, phonemes = process_texts(cfg, [text for _, text in items])
 
     meta = cfg.paths.dataset_dir / "metadata.csv"
     with meta.open("w", encoding="utf-8", newline="") as f:
         w = csv.writer(f, delimiter="|", quoting=csv.QUOTE_MINIMAL)
-        for r in rows:
-            w.writerow(r)
+        for (out_id, text), norm in zip(items, normalized):
+            w.writerow((out_id, text, norm))
+
+    phon_meta = cfg.paths.dataset_dir / "metadata_phonemes.csv"
+    if phonemes is not None:
+        with phon_meta.open("w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f, delimiter="|", quoting=csv.QUOTE_MINIMAL)
+            for (out_id, _), phon in zip(items, phonemes):
+                w.writerow((out_id, phon))
+    else:
+        # Drop phonemes from an earlier build so they cannot drift from metadata.csv.
+        phon_meta.unlink(missing_ok=True)
+
+    pack = cfg.paths.dataset_dir / PACK_NAME
+    if cfg.audio.pack:
+        pack_dir(wavs_dir, pack)
+        shutil.rmtree(wavs_dir)
+    else:
+        pack.unlink(missing_ok=True)
 
     print(f"✅ Dataset built: {cfg.paths.dataset_dir}")
-    print(f"   wavs: {wavs_dir}")
+    print(f"   wavs: {pack if cfg.audio.pack else wavs_dir}")
     print(f"   metadata: {meta}")
+    if phonemes is not None:
+        print(f"   phonemes: {phon_meta}")
 
 
 def validate_dataset(cfg: SuiteConfig) -> None:
     meta = cfg.paths.dataset_dir / "metadata.csv"
-    wavs_dir = cfg.paths.dataset_dir / "wavs"
     if not meta.exists():
         raise RuntimeError(f"metadata.csv not found: {meta}")
-    if not wavs_dir.exists():
-        raise RuntimeError(f"wavs/ not found: {wavs_dir}")
+    audio_index = dataset_audio_index(cfg.paths.dataset_dir)
 
     # Basic checks
     lines = meta.read_text(encoding="utf-8").splitlines()
@@ -102,11 +135,10 @@ def validate_dataset(cfg: SuiteConfig) -> None:
         if len(parts) < 2:
             raise RuntimeError(f"Bad metadata row: {ln}")
         fid = parts[0]
-        wav = wavs_dir / f"{fid}.wav"
-        if not wav.exists():
+        if fid not in audio_index:
             missing_wavs.append(fid)
 
     if missing_wavs:
-        raise RuntimeError(f"Missing wav files for ids: {missing_wavs[:20]} ...")
+        raise RuntimeError(f"Missing audio files for ids: {missing_wavs[:20]} ...")
 
     print(f"✅ Dataset looks OK: {cfg.paths.dataset_dir} (rows={len(lines)})")
\ No newline at end of file
@@ -58,6 +58,13 @@ def export_onnx(cfg: SuiteConfig, checkpoint_dir: Path) -> tuple[Path, Path]:
             "noise_w": 0.8
         }
     }
+    # Carry over what inference needs from the training config, if present.
+    train_config = checkpoint_dir / "config.json"
+    if train_config.exists():
+        tc = json.loads(train_config.read_text(encoding="utf-8"))
+        for key in ("phoneme_type", "phoneme_id_map", "num_speakers", "speaker_id_map"):
+            if key in tc:
+                meta[key] = tc[key]
     meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
 
     print(f"✅ Exported: {onnx_path}")
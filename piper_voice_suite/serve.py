@@ -0,0 +1,377 @@
+from __future__ import annotations
+import asyncio
+import json
+import queue
+import re
+import statistics
+import struct
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import uvicorn
+
+from .config import SuiteConfig
+from .text import get_backend, normalize_text
+
+# Knob order matches the Piper "scales" input: (noise_scale, length_scale, noise_w).
+Knobs = tuple[float, float, float, int]
+
+
+def _require_ort():
+    try:
+        import numpy as np
+        import onnxruntime as ort
+    except ImportError as e:
+        raise RuntimeError(
+            f"Missing Python dependency: {e.name}\n"
+            "Install onnxruntime (CPU build) to use `pvs serve`: pip install onnxruntime"
+        ) from e
+    return np, ort
+
+
+def _wav_stream_header(sample_rate: int) -> bytes:
+    # Sizes are unknown while streaming; 0xFFFFFFFF is the conventional placeholder.
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+def _split_sentences(text: str) -> list[str]:
+    return [s for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()]
+
+
+class AudioCache:
+    """LRU cache of PCM16 sentence audio, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[tuple[str, Knobs], bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, Knobs]) -> Optional[bytes]:
+        with self._lock:
+            pcm = self._items.get(key)
+            if pcm is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return pcm
+
+    def put(self, key: tuple[str, Knobs], pcm: bytes) -> None:
+        if len(pcm) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._items[key] = pcm
+            self.bytes += len(pcm)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class VoiceModel:
+    """
+    An exported Piper voice (model.onnx + model.onnx.json) behind a pool of
+    warm CPU onnxruntime sessions.
+    """
+
+    def __init__(self, cfg: SuiteConfig, model_dir: Path) -> None:
+        self.np, ort = _require_ort()
+        onnx_path = model_dir / "model.onnx"
+        meta_path = model_dir / "model.onnx.json"
+        if not onnx_path.exists() or not meta_path.exists():
+            raise RuntimeError(f"Exported model not found in {model_dir}. Run: pvs export ...")
+
+        self.meta: dict[str, Any] = json.loads(meta_path.read_text(encoding="utf-8"))
+        self.phoneme_id_map: dict[str, list[int]] = self.meta.get("phoneme_id_map") or {}
+        if not self.phoneme_id_map:
+            raise RuntimeError(
+                f"{meta_path} has no phoneme_id_map.\n"
+                "Export from a checkpoint directory that contains the training config.json."
+            )
+        self.voice_id = str(self.meta.get("voice_id", cfg.voice_id))
+        self.language = str(self.meta.get("language", cfg.language))
+        self.sample_rate = int(self.meta.get("sample_rate") or self.meta.get("audio", {}).get("sample_rate") or cfg.sample_rate)
+        inference = self.meta.get("inference", {})
+        self.default_knobs: Knobs = (
+            float(inference.get("noise_scale", 0.667)),
+            float(inference.get("length_scale", 1.0)),
+            float(inference.get("noise_w", 0.8)),
+            0,
+        )
+        self.num_speakers = int(self.meta.get("num_speakers", 1))
+        # Always piper-phonemize: it is what the model was trained on (punctuation included).
+        self.phonemizer = get_backend("piper")
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = cfg.serve.threads_per_session
+        opts.inter_op_num_threads = 1
+        sessions = [
+            ort.InferenceSession(str(onnx_path), sess_options=opts, providers=["CPUExecutionProvider"])
+            for _ in range(max(1, cfg.serve.sessions))
+        ]
+        self.session_count = len(sessions)
+        self._has_sid = any(i.name == "sid" for i in sessions[0].get_inputs())
+        self._sessions: queue.Queue = queue.Queue()
+        for sess in sessions:
+            self._sessions.put(sess)
+
+        # Warm every session so the first real request does not pay graph init costs.
+        warm_ids = self._phoneme_ids("")
+        for _ in range(self.session_count):
+            self.infer(warm_ids, self.default_knobs)
+
+    def _phoneme_ids(self, phonemes: str) -> list[int]:
+        # Same layout as piper-phonemize: BOS, PAD, then each phoneme followed by PAD, EOS.
+        m = self.phoneme_id_map
+        ids = list(m.get("^", [])) + list(m.get("_", []))
+        for ph in unicodedata.normalize("NFD", phonemes):
+            if ph in m:
+                ids.extend(m[ph])
+                ids.extend(m.get("_", []))
+        ids.extend(m.get("$", []))
+        return ids
+
+    def check_knobs(self, knobs: Knobs) -> Optional[str]:
+        """Returns an error message for out-of-range inference knobs, else None."""
+        noise_scale, length_scale, noise_w, speaker_id = knobs
+        if length_scale <= 0:
+            return "length_scale must be > 0"
+        if noise_scale < 0 or noise_w < 0:
+            return "noise_scale and noise_w must be >= 0"
+        if not 0 <= speaker_id < (self.num_speakers if self._has_sid else 1):
+            return f"speaker_id must be in [0, {self.num_speakers if self._has_sid else 1})"
+        return None
+
+    def phoneme_ids(self, sentence: str) -> list[int]:
+        """Phonemizes one normalized sentence to model input ids (blocking); ValueError if nothing is speakable."""
+        phonemes = self.phonemizer.phonemize([sentence], self.language)[0]
+        if not any(ph in self.phoneme_id_map for ph in unicodedata.normalize("NFD", phonemes)):
+            raise ValueError(f"No phonemes known to this voice in: {sentence!r}")
+        return self._phoneme_ids(phonemes)
+
+    def infer(self, ids: list[int], knobs: Knobs) -> bytes:
+        """Runs the model on phoneme ids and returns mono PCM16 bytes (blocking)."""
+        np = self.np
+        feeds = {
+            "input": np.array([ids], dtype=np.int64),
+            "input_lengths": np.array([len(ids)], dtype=np.int64),
+            "scales": np.array(knobs[:3], dtype=np.float32),
+        }
+        if self._has_sid:
+            feeds["sid"] = np.array([knobs[3]], dtype=np.int64)
+        sess = self._sessions.get()
+        try:
+            audio = sess.run(None, feeds)[0].squeeze()
+        finally:
+            self._sessions.put(sess)
+        peak = float(np.max(np.abs(audio))) if audio.size else 0.0
+        audio = audio * (32767.0 / max(0.01, peak))
+        return np.clip(audio, -32768, 32767).astype("<i2").tobytes()
+
+
+class MicroBatcher:
+    """
+    Collects sentence jobs from concurrent requests for up to `wait_ms` (or
+    `max_batch` jobs), collapses duplicates and fans the batch out over the
+    session pool. Finished audio goes into the LRU cache.
+    """
+
+    def __init__(self, model: VoiceModel, cache: AudioCache, max_batch: int, wait_ms: float) -> None:
+        self.model = model
+        self.cache = cache
+        self.max_batch = max(1, max_batch)
+        self.wait_s = max(0.0, wait_ms) / 1000.0
+        self.executor = ThreadPoolExecutor(max_workers=model.session_count)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, key: tuple[str, Knobs], ids: list[int]) -> bytes:
+        """Synthesizes an uncached (sentence, knobs) key from its phoneme ids."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._loop())
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((key, ids, fut))
+        return await fut
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.wait_s
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups: dict[tuple[str, Knobs], tuple[list[int], list[asyncio.Future]]] = {}
+            for key, ids, fut in batch:
+                groups.setdefault(key, (ids, []))[1].append(fut)
+            for key, (ids, futs) in groups.items():
+                asyncio.create_task(self._dispatch(key, ids, futs))
+
+    async def _dispatch(self, key: tuple[str, Knobs], ids: list[int], futs: list[asyncio.Future]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            pcm = await loop.run_in_executor(self.executor, self.model.infer, ids, key[1])
+        except Exception as e:
+            for fut in futs:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.cache.put(key, pcm)
+        for fut in futs:
+            if not fut.done():
+                fut.set_result(pcm)
+
+
+def make_app(cfg: SuiteConfig, model_dir: Path) -> FastAPI:
+    app = FastAPI(title="Piper Voice Preview")
+
+    model = VoiceModel(cfg, model_dir)
+    cache = AudioCache(cfg.serve.cache_mb * 1024 * 1024)
+    batcher = MicroBatcher(model, cache, cfg.serve.max_batch, cfg.serve.batch_wait_ms)
+    latencies: deque = deque(maxlen=500)
+
+    @app.get("/api/info")
+    def info():
+        return {
+            "voice_id": model.voice_id,
+            "language": model.language,
+            "sample_rate": model.sample_rate,
+            "sessions": model.session_count,
+            "inference": dict(zip(("noise_scale", "length_scale", "noise_w"), model.default_knobs[:3])),
+        }
+
+    @app.get("/api/tts")
+    async def tts(
+        text: str,
+        length_scale: Optional[float] = None,
+        noise_scale: Optional[float] = None,
+        noise_w: Optional[float] = None,
+        speaker_id: int = 0,
+    ):
+        sentences = _split_sentences(normalize_text(text, model.language))
+        if not sentences:
+            raise HTTPException(status_code=400, detail="text is empty")
+        d_noise, d_length, d_noise_w, _ = model.default_knobs
+        knobs: Knobs = (
+            d_noise if noise_scale is None else noise_scale,
+            d_length if length_scale is None else length_scale,
+            d_noise_w if noise_w is None else noise_w,
+            speaker_id,
+        )
+        error = model.check_knobs(knobs)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+
+        t0 = time.perf_counter()
+        # Phonemize uncached sentences before the 200 + WAV header go out, so bad
+        # input is reported as a 4xx instead of a silently truncated file.
+        keys = [(s, knobs) for s in sentences]
+        cached = [cache.get(key) for key in keys]
+        missing = [key[0] for key, pcm in zip(keys, cached) if pcm is None]
+        try:
+            ids = dict(zip(missing, await run_in_threadpool(lambda: [model.phoneme_ids(s) for s in missing])))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        hits = len(keys) - len(missing)
+
+        async def ready(pcm: bytes) -> bytes:
+            return pcm
+
+        # Queue every sentence up front so they synthesize in parallel; stream in order.
+        jobs = [
+            asyncio.ensure_future(ready(pcm) if pcm is not None else batcher.submit(key, ids[key[0]]))
+            for key, pcm in zip(keys, cached)
+        ]
+
+        async def body():
+            first_ms: Optional[float] = None
+            try:
+                yield _wav_stream_header(model.sample_rate)
+                for job in jobs:
+                    pcm = await job
+                    if first_ms is None:
+                        first_ms = (time.perf_counter() - t0) * 1000.0
+                    yield pcm
+            except Exception as e:
+                # Headers are already sent; all we can do is end the stream and log it.
+                print(f"⚠️ {model.voice_id}: synthesis failed mid-stream: {e}")
+                raise
+            finally:
+                for job in jobs:
+                    job.cancel()
+                total_ms = (time.perf_counter() - t0) * 1000.0
+                latencies.append({
+                    "chars": len(text),
+                    "sentences": len(sentences),
+                    "cache_hits": hits,
+                    "first_chunk_ms": round(first_ms or total_ms, 2),
+                    "total_ms": round(total_ms, 2),
+                })
+                print(f"🔊 {model.voice_id}: {len(sentences)} sentence(s), {hits} cached, "
+                      f"first={first_ms or total_ms:.1f}ms total={total_ms:.1f}ms")
+
+        return StreamingResponse(body(), media_type="audio/wav")
+
+    @app.get("/api/stats")
+    def stats():
+        def summary(field: str) -> dict[str, float]:
+            vals = sorted(r[field] for r in latencies)
+            if not vals:
+                return {}
+            return {
+                "p50": round(statistics.median(vals), 2),
+                "p95": round(vals[min(len(vals) - 1, int(len(vals) * 0.95))], 2),
+                "max": vals[-1],
+            }
+
+        return {
+            "voice_id": model.voice_id,
+            "requests": len(latencies),
+            "first_chunk_ms": summary("first_chunk_ms"),
+            "total_ms": summary("total_ms"),
+            "cache": cache.stats(),
+            "recent": list(latencies)[-20:],
+        }
+
+    return app
+
+
+def run_serve(cfg: SuiteConfig, model_dir: Optional[Path] = None, host: str = "127.0.0.1", port: int = 7861) -> None:
+    model_dir = model_dir or (cfg.paths.out_dir / cfg.voice_id)
+    app = make_app(cfg, model_dir)
+    print(f"🔈 Piper Voice Preview: http://{host}:{port}/api/tts?text=Hello+world")
+    uvicorn.run(app, host=host, port=port, log_level="info")
\ No newline at end of file
@@ -0,0 +1,318 @@
+from __future__ import annotations
+import shutil
+import struct
+import subprocess
+import tarfile
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+from .config import SuiteConfig
+from .deps import assert_deps
+from .utils import ensure_dir, CmdError
+
+AUDIO_EXTS = (".wav", ".flac")
+PACK_NAME = "wavs.tar.zst"
+# Written into an export-wav tree once it is complete.
+EXPORT_STAMP = ".export_complete"
+
+
+def audio_ext(cfg: SuiteConfig) -> str:
+    """File extension for audio written by the studio and dataset build."""
+    if cfg.audio.storage not in ("wav", "flac"):
+        raise RuntimeError(f"Unknown audio.storage: {cfg.audio.storage} (expected 'wav' or 'flac')")
+    return f".{cfg.audio.storage}"
+
+
+def require_zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError(
+            "Missing Python dependency: zstandard\n"
+            "Install it to use audio.pack: pip install zstandard"
+        ) from e
+    return zstandard
+
+
+def _ffmpeg_pipe(args: list[str], data: bytes) -> bytes:
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-i", "pipe:0", *args]
+    proc = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if proc.returncode != 0:
+        raise CmdError(f"Command failed ({proc.returncode}): {' '.join(cmd)}\n\n{proc.stderr.decode(errors='replace')}")
+    return proc.stdout
+
+
+def decode_to_wav(data: bytes, out_wav: Path) -> None:
+    """Decodes any ffmpeg-readable audio (WAV, FLAC, ...) to a 16-bit PCM WAV file."""
+    _ffmpeg_pipe(["-c:a", "pcm_s16le", str(out_wav)], data)
+
+
+def list_takes(takes_dir: Path) -> list[Path]:
+    """Recorded takes, one per index; if a take exists in several formats the newest wins."""
+    by_stem: dict[str, Path] = {}
+    for p in sorted(takes_dir.iterdir()):
+        if p.suffix not in AUDIO_EXTS:
+            continue
+        cur = by_stem.get(p.stem)
+        if cur is None or p.stat().st_mtime > cur.stat().st_mtime:
+            by_stem[p.stem] = p
+    return sorted(by_stem.values())
+
+
+# ---------------------------------------------------------------------------
+# Pack files (tar stream compressed with zstd)
+# ---------------------------------------------------------------------------
+
+def pack_dir(src_dir: Path, pack_path: Path, level: int = 10) -> Path:
+    zstandard = require_zstd()
+    tmp = pack_path.with_suffix(pack_path.suffix + ".tmp")
+    with tmp.open("wb") as raw:
+        with zstandard.ZstdCompressor(level=level).stream_writer(raw) as zf:
+            with tarfile.open(fileobj=zf, mode="w|") as tar:
+                for p in sorted(src_dir.iterdir()):
+                    if p.is_file():
+                        tar.add(str(p), arcname=p.name)
+    tmp.replace(pack_path)
+    return pack_path
+
+
+def iter_pack(pack_path: Path) -> Iterator[tuple[str, bytes]]:
+    """Streams (member name, bytes) out of a pack without extracting it to disk."""
+    zstandard = require_zstd()
+    with pack_path.open("rb") as raw:
+        with zstandard.ZstdDecompressor().stream_reader(raw) as zf:
+            with tarfile.open(fileobj=zf, mode="r|") as tar:
+                for member in tar:
+                    if not member.isfile():
+                        continue
+                    f = tar.extractfile(member)
+                    if f is not None:
+                        yield member.name, f.read()
+
+
+def list_pack(pack_path: Path) -> list[str]:
+    zstandard = require_zstd()
+    with pack_path.open("rb") as raw:
+        with zstandard.ZstdDecompressor().stream_reader(raw) as zf:
+            with tarfile.open(fileobj=zf, mode="r|") as tar:
+                return [m.name for m in tar if m.isfile()]
+
+
+# ---------------------------------------------------------------------------
+# Dataset readers
+# ---------------------------------------------------------------------------
+
+def is_packed_dataset(dataset_dir: Path) -> bool:
+    """True for a wavs.tar.zst dataset, False for loose wavs/; errors if the layout is missing or ambiguous."""
+    has_dir = (dataset_dir / "wavs").exists()
+    has_pack = (dataset_dir / PACK_NAME).exists()
+    if has_dir and has_pack:
+        # e.g. a packed build that failed before removing wavs/
+        raise RuntimeError(
+            f"Both wavs/ and {PACK_NAME} exist in: {dataset_dir}\n"
+            "Re-run `pvs dataset build` or remove the stale one."
+        )
+    if not has_dir and not has_pack:
+        raise RuntimeError(f"Neither wavs/ nor {PACK_NAME} found in: {dataset_dir}")
+    return has_pack
+
+
+def dataset_audio_index(dataset_dir: Path) -> dict[str, str]:
+    """
+    Maps utterance id -> file name for the dataset audio, whether it is stored
+    as loose wavs/<id>.wav|.flac or inside wavs.tar.zst.
+    """
+    if is_packed_dataset(dataset_dir):
+        names = [n for n in list_pack(dataset_dir / PACK_NAME) if Path(n).suffix in AUDIO_EXTS]
+    else:
+        names = [p.name for p in (dataset_dir / "wavs").iterdir() if p.suffix in AUDIO_EXTS]
+    return {Path(n).stem: n for n in names}
+
+
+def iter_dataset_audio(dataset_dir: Path) -> Iterator[tuple[str, bytes]]:
+    """Yields (utterance id, encoded audio bytes) for every dataset item."""
+    wavs_dir = dataset_dir / "wavs"
+    if not is_packed_dataset(dataset_dir):
+        for p in sorted(wavs_dir.iterdir()):
+            if p.suffix in AUDIO_EXTS:
+                yield p.stem, p.read_bytes()
+    else:
+        for name, data in iter_pack(dataset_dir / PACK_NAME):
+            if Path(name).suffix in AUDIO_EXTS:
+                yield Path(name).stem, data
+
+
+def default_export_dir(cfg: SuiteConfig) -> Path:
+    src = cfg.paths.dataset_dir
+    return src.parent / f"{src.name}_wav"
+
+
+def wav_export_is_current(cfg: SuiteConfig, out_dir: Path | None = None) -> bool:
+    """True if a complete export-wav tree exists that is newer than the dataset it came from."""
+    src = cfg.paths.dataset_dir
+    stamp = (out_dir or default_export_dir(cfg)) / EXPORT_STAMP
+    if not stamp.exists():
+        return False
+    sources = [src / name for name in ("metadata.csv", "metadata_phonemes.csv", "wavs", PACK_NAME)]
+    newest = max((p.stat().st_mtime for p in sources if p.exists()), default=0.0)
+    return stamp.stat().st_mtime >= newest
+
+
+def export_wav_dataset(cfg: SuiteConfig, out_dir: Path | None = None) -> Path:
+    """
+    Writes a plain LJSpeech tree (wavs/<id>.wav + metadata.csv) for trainers
+    that cannot read FLAC or packed datasets.
+    """
+    assert_deps()
+    src = cfg.paths.dataset_dir
+    out_dir = out_dir or default_export_dir(cfg)
+    if out_dir == src:
+        raise RuntimeError("export-wav output must differ from dataset_dir")
+    meta = src / "metadata.csv"
+    if not meta.exists():
+        raise RuntimeError(f"metadata.csv not found: {meta}")
+
+    stamp = out_dir / EXPORT_STAMP
+    stamp.unlink(missing_ok=True)
+    wavs_dir = out_dir / "wavs"
+    if wavs_dir.exists():
+        # Re-exports must not keep utterances that were dropped from the dataset.
+        shutil.rmtree(wavs_dir)
+    ensure_dir(wavs_dir)
+    for name in ("metadata.csv", "metadata_phonemes.csv"):
+        if (src / name).exists():
+            shutil.copyfile(src / name, out_dir / name)
+        else:
+            (out_dir / name).unlink(missing_ok=True)
+
+    n = 0
+    for fid, data in iter_dataset_audio(src):
+        decode_to_wav(data, wavs_dir / f"{fid}.wav")
+        n += 1
+    stamp.write_text(f"{n}\n", encoding="utf-8")
+
+    print(f"✅ Exported WAV dataset: {out_dir} ({n} files)")
+    return out_dir
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def _wav_pcm_info(raw: bytes) -> tuple[int, int]:
+    """Returns (PCM data bytes, byte rate) of a WAV blob, ignoring header sizes (ffmpeg leaves them unset on pipes)."""
+    byte_rate = 0
+    pos = 12
+    while pos + 8 <= len(raw):
+        chunk_id, size = raw[pos:pos + 4], struct.unpack("<I", raw[pos + 4:pos + 8])[0]
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack("<I", raw[pos + 16:pos + 20])[0]
+        elif chunk_id == b"data":
+            return len(raw) - (pos + 8), byte_rate
+        pos += 8 + size + (size & 1)
+    return 0, byte_rate
+
+
+def _ffmpeg_spawn_overhead(runs: int = 3) -> float:
+    """Seconds ffmpeg needs to start and decode a near-empty file: the fixed per-file cost of the reader path."""
+    silence = (
+        b"RIFF" + struct.pack("<I", 38) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, 22050, 44100, 2, 16)
+        + b"data" + struct.pack("<I", 2) + b"\0\0"
+    )
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        _ffmpeg_pipe(["-c:a", "pcm_s16le", "-f", "wav", "-"], silence)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _bench(label: str, items: Iterator[tuple[str, bytes]], stored_bytes: int | None) -> dict[str, Any]:
+    n = 0
+    encoded = 0
+    pcm = 0
+    audio_s = 0.0
+    read_s = 0.0
+    decode_s = 0.0
+    it = iter(items)
+    t_start = time.perf_counter()
+    while True:
+        # Reading (and for packs, zstd + tar decoding) happens inside next(); time it too.
+        t0 = time.perf_counter()
+        try:
+            _, data = next(it)
+        except StopIteration:
+            break
+        t1 = time.perf_counter()
+        raw = _ffmpeg_pipe(["-c:a", "pcm_s16le", "-f", "wav", "-"], data)
+        t2 = time.perf_counter()
+        read_s += t1 - t0
+        decode_s += t2 - t1
+        data_bytes, byte_rate = _wav_pcm_info(raw)
+        pcm += data_bytes
+        audio_s += data_bytes / byte_rate if byte_rate else 0.0
+        encoded += len(data)
+        n += 1
+    total_s = time.perf_counter() - t_start
+
+    spawn_s = _ffmpeg_spawn_overhead() if n else 0.0
+    # Codec time with the per-file process start-up removed (floored to avoid dividing by ~0).
+    codec_s = max(decode_s - n * spawn_s, decode_s * 0.01)
+
+    stored = stored_bytes if stored_bytes is not None else encoded
+    return {
+        "label": label,
+        "files": n,
+        "stored_mb": round(stored / 1e6, 2),
+        "pcm_mb": round(pcm / 1e6, 2),
+        "compression_ratio": round(pcm / stored, 2) if stored else 0.0,
+        "audio_seconds": round(audio_s, 1),
+        "total_seconds": round(total_s, 2),
+        "read_seconds": round(read_s, 2),
+        "decode_seconds": round(decode_s, 2),
+        "ffmpeg_spawn_ms_per_file": round(spawn_s * 1000.0, 1),
+        "end_to_end_mb_per_s": round(pcm / 1e6 / total_s, 1) if total_s else 0.0,
+        "end_to_end_x_realtime": round(audio_s / total_s, 1) if total_s else 0.0,
+        "codec_mb_per_s": round(pcm / 1e6 / codec_s, 1) if codec_s else 0.0,
+    }
+
+
+def benchmark_storage(cfg: SuiteConfig) -> list[dict[str, Any]]:
+    """
+    Reports compression ratio (decoded PCM bytes / bytes on disk) and decode
+    throughput for the recorded takes and the built dataset. Throughput is
+    given end to end (reading, pack decompression and ffmpeg) and for the codec
+    alone, with ffmpeg's per-file start-up cost reported separately.
+    """
+    assert_deps()
+    results = []
+    takes_dir = cfg.paths.recordings_dir / "takes"
+    if takes_dir.exists():
+        takes = list_takes(takes_dir)
+        if takes:
+            results.append(_bench("takes", ((p.stem, p.read_bytes()) for p in takes), None))
+
+    dataset_dir = cfg.paths.dataset_dir
+    pack = dataset_dir / PACK_NAME
+    if (dataset_dir / "wavs").exists() or pack.exists():
+        if is_packed_dataset(dataset_dir):
+            results.append(_bench("dataset (packed)", iter_dataset_audio(dataset_dir), pack.stat().st_size))
+        else:
+            results.append(_bench("dataset", iter_dataset_audio(dataset_dir), None))
+
+    if not results:
+        raise RuntimeError("Nothing to benchmark: no takes or dataset audio found")
+
+    for r in results:
+        print(
+            f"📦 {r['label']}: {r['files']} files, {r['stored_mb']} MB stored / {r['pcm_mb']} MB PCM "
+            f"(ratio {r['compression_ratio']}x)"
+        )
+        print(
+            f"   read+decode {r['end_to_end_mb_per_s']} MB/s ({r['end_to_end_x_realtime']}x realtime; "
+            f"read {r['read_seconds']}s, ffmpeg {r['decode_seconds']}s of {r['total_seconds']}s); "
+            f"ffmpeg start-up {r['ffmpeg_spawn_ms_per_file']} ms/file, codec alone ~{r['codec_mb_per_s']} MB/s"
+        )
+    return results
\ No newline at end of file
@@ -4,13 +4,15 @@ from pathlib import Path
 from typing import Optional
 
 from fastapi import FastAPI, UploadFile, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
 from .config import SuiteConfig
 from .prompts import load_prompts, pick_prompts, write_prompt_manifest
-from .utils import ensure_dir, write_text
+from .storage import AUDIO_EXTS, audio_ext
+from .utils import ensure_dir, run, write_text
 
 
 def make_app(cfg: SuiteConfig) -> FastAPI:
@@ -28,6 +30,7 @@ def make_app(cfg: SuiteConfig) -> FastAPI:
     session_file = cfg.paths.recordings_dir / "session.txt"
     write_text(session_file, f"voice_id={cfg.voice_id}\nmanifest={manifest}\ncount={len(picked)}\n")
 
+    ext = audio_ext(cfg)
     html = _render_html(cfg.voice_id)
 
     @app.get("/", response_class=HTMLResponse)
@@ -44,12 +47,26 @@ def make_app(cfg: SuiteConfig) -> FastAPI:
         text: str = Form(...),
         file: UploadFile = Form(...),
     ):
-        # Store as <idx>.wav and <idx>.txt
-        wav_path = takes_dir / f"{idx}.wav"
+        # Store as <idx>.wav (or <idx>.flac) and <idx>.txt
+        wav_path = takes_dir / f"{idx}{ext}"
         txt_path = takes_dir / f"{idx}.txt"
 
         content = await file.read()
-        wav_path.write_bytes(content)
+        if ext == ".flac":
+            raw_path = takes_dir / f"{idx}.upload"
+            raw_path.write_bytes(content)
+            try:
+                await run_in_threadpool(
+                    run, ["ffmpeg", "-y", "-i", str(raw_path), "-c:a", "flac", "-sample_fmt", "s16", str(wav_path)]
+                )
+            finally:
+                raw_path.unlink(missing_ok=True)
+        else:
+            wav_path.write_bytes(content)
+        # Drop a retake left over in the other storage format.
+        for stale_ext in AUDIO_EXTS:
+            if stale_ext != ext:
+                (takes_dir / f"{idx}{stale_ext}").unlink(missing_ok=True)
         write_text(txt_path, text.strip() + "\n")
 
         return {"ok": True, "saved": str(wav_path.name)}
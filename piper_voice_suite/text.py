@@ -0,0 +1,428 @@
+from __future__ import annotations
+import re
+import sqlite3
+import threading
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from .config import SuiteConfig
+from .utils import ensure_dir, which, run_output
+
+# Bump when normalization rules change so cached results are recomputed.
+NORMALIZER_VERSION = "3"
+
+
+# ---------------------------------------------------------------------------
+# Normalization
+# ---------------------------------------------------------------------------
+
+_ONES = [
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+    "ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen",
+    "seventeen", "eighteen", "nineteen",
+]
+_TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+_SCALES = [(10**9, "billion"), (10**6, "million"), (10**3, "thousand")]
+_ORDINAL_IRREGULAR = {
+    "one": "first", "two": "second", "three": "third", "five": "fifth",
+    "eight": "eighth", "nine": "ninth", "twelve": "twelfth",
+}
+
+_EN_ABBREVIATIONS = {
+    "Mr.": "mister",
+    "Mrs.": "missus",
+    "Ms.": "miss",
+    "Dr.": "doctor",
+    "Jr.": "junior",
+    "Sr.": "senior",
+    "Prof.": "professor",
+    "vs.": "versus",
+    "etc.": "et cetera",
+    "e.g.": "for example",
+    "i.e.": "that is",
+}
+
+_PUNCT_MAP = str.maketrans({
+    "“": '"', "”": '"', "„": '"',
+    "‘": "'", "’": "'",
+    "–": ", ", "—": ", ",
+    "…": "...",
+})
+
+
+def _int_to_words(n: int) -> str:
+    if n < 0:
+        return "minus " + _int_to_words(-n)
+    if n < 20:
+        return _ONES[n]
+    if n < 100:
+        t, o = divmod(n, 10)
+        return _TENS[t] + (f"-{_ONES[o]}" if o else "")
+    if n < 1000:
+        h, r = divmod(n, 100)
+        return f"{_ONES[h]} hundred" + (f" {_int_to_words(r)}" if r else "")
+    if n >= 1000 * _SCALES[0][0]:
+        # Too large to read naturally; spell it out digit by digit.
+        return " ".join(_ONES[int(d)] for d in str(n))
+    for scale, name in _SCALES:
+        if n >= scale:
+            q, r = divmod(n, scale)
+            return f"{_int_to_words(q)} {name}" + (f" {_int_to_words(r)}" if r else "")
+    raise AssertionError("unreachable")
+
+
+def _ordinal_words(n: int) -> str:
+    words = _int_to_words(n)
+    head, sep, last = max(words.rpartition(" "), words.rpartition("-"), key=lambda t: len(t[0]))
+    if last in _ORDINAL_IRREGULAR:
+        last = _ORDINAL_IRREGULAR[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return head + sep + last
+
+
+def _year_words(n: int) -> str:
+    # 1999 -> nineteen ninety-nine, 1905 -> nineteen oh five, 2005 -> two thousand five
+    if 2000 <= n < 2010:
+        return _int_to_words(n)
+    hi, lo = divmod(n, 100)
+    if lo == 0:
+        return f"{_int_to_words(hi)} hundred"
+    if lo < 10:
+        return f"{_int_to_words(hi)} oh {_ONES[lo]}"
+    return f"{_int_to_words(hi)} {_int_to_words(lo)}"
+
+
+def _num(s: str) -> int:
+    return int(s.replace(",", ""))
+
+
+# An integer, optionally with thousands separators ("1,000,000").
+_NUM = r"\d{1,3}(?:,\d{3})+|\d+"
+
+
+def _expand_numbers_en(text: str) -> str:
+    def money(m: re.Match) -> str:
+        dollars = _num(m.group(1))
+        out = f"{_int_to_words(dollars)} dollar" + ("" if dollars == 1 else "s")
+        if m.group(2):
+            cents = int(m.group(2).ljust(2, "0"))
+            if cents:
+                out += f" and {_int_to_words(cents)} cent" + ("" if cents == 1 else "s")
+        return out
+
+    def decimal(m: re.Match) -> str:
+        return f"{_int_to_words(_num(m.group(1)))} point " + " ".join(_ONES[int(d)] for d in m.group(2))
+
+    def clock(m: re.Match) -> str:
+        hour, minute, ampm = int(m.group(1)), int(m.group(2)), m.group(3)
+        out = _int_to_words(hour)
+        if minute == 0:
+            out += "" if ampm else " o'clock"
+        elif minute < 10:
+            out += f" oh {_ONES[minute]}"
+        else:
+            out += f" {_int_to_words(minute)}"
+        if ampm:
+            out += f" {ampm.lower()} m"
+        return out
+
+    def phone(m: re.Match) -> str:
+        return ", ".join(" ".join(_ONES[int(d)] for d in group) for group in m.group(0).split("-"))
+
+    def integer(m: re.Match) -> str:
+        s = m.group(0)
+        n = _num(s)
+        before, after = m.string[:m.start()], m.string[m.end():]
+        # Only a standalone number is a year; "555-1234" or "1234 5678" are not.
+        grouped = re.search(r"(?:-|\d[\s.]?)$", before) or re.match(r"-|[\s.]?\d", after)
+        if len(s) == 4 and 1100 <= n <= 2099 and not grouped:
+            return _year_words(n)
+        return _int_to_words(n)
+
+    # A comma between digits that is not a thousands separator ("1,2") separates a list.
+    text = re.sub(r"(\d),(?!\d{3}(?!\d))(?=\d)", r"\1, ", text)
+    text = re.sub(r"(?<![\w-])-(?=\d)", "minus ", text)
+    text = re.sub(r"\$(\d[\d,]*)(?:\.(\d{1,2}))?\b", money, text)
+    text = re.sub(r"(\d[\d,]*(?:\.\d+)?)\s?%", lambda m: f"{m.group(1)} percent", text)
+    text = re.sub(r"\b(?:\d{3}-)?\d{3}-\d{4}\b", phone, text)
+    text = re.sub(r"\b([01]?\d|2[0-3]):([0-5]\d)(?!\d)(?:\s?([ap])\.?m(?![a-z])\.?)?", clock, text, flags=re.IGNORECASE)
+    text = re.sub(rf"\b({_NUM})(?:st|nd|rd|th)\b", lambda m: _ordinal_words(_num(m.group(1))), text)
+    text = re.sub(r"\b(\d[\d,]*)\.(\d+)\b", decimal, text)
+    text = re.sub(rf"\b(?:{_NUM})\b", integer, text)
+    return text
+
+
+def _expand_abbreviations_en(text: str) -> str:
+    for abbr, full in _EN_ABBREVIATIONS.items():
+        text = re.sub(r"(?<!\w)" + re.escape(abbr), full, text)
+    return text
+
+
+def normalize_text(text: str, language: str) -> str:
+    """
+    Normalizes a transcript for training.
+
+    Punctuation is cleaned up for every language; numbers and abbreviations are
+    only expanded for English (en_*), other languages keep them as written.
+    """
+    text = unicodedata.normalize("NFKC", text).translate(_PUNCT_MAP)
+    if language.lower().startswith("en"):
+        text = _expand_abbreviations_en(text)
+        text = _expand_numbers_en(text)
+
+    text = re.sub(r"\s+", " ", text).strip()
+    text = re.sub(r"\s+([,.;:!?])", r"\1", text)
+    text = re.sub(r",+", ",", text)
+    text = re.sub(r"^[,\s]+", "", text)
+    if text and text[-1] not in ".!?":
+        text = text.rstrip(",;:") + "."
+    return text
+
+
+# ---------------------------------------------------------------------------
+# Phonemizer backends
+# ---------------------------------------------------------------------------
+
+def _espeak_voice(language: str) -> str:
+    return language.lower().replace("_", "-")
+
+
+class PiperBackend:
+    """
+    Phonemizes in-process with piper-phonemize, the library Piper's own
+    preprocessing uses, so output (including punctuation) matches the trainer.
+    """
+
+    name = "piper"
+
+    def __init__(self) -> None:
+        try:
+            import piper_phonemize
+        except ImportError as e:
+            raise RuntimeError(
+                "Missing Python dependency: piper-phonemize\n"
+                "Install it (pip install piper-phonemize), pick another text.phoneme_backend "
+                "or set text.phonemize: false in your config."
+            ) from e
+        self._lib = piper_phonemize
+        # espeak-ng keeps global state and is not safe to call from several threads at once.
+        self._lock = threading.Lock()
+
+    def version(self) -> str:
+        from importlib.metadata import PackageNotFoundError, version
+        try:
+            return version("piper-phonemize")
+        except PackageNotFoundError:
+            return "unknown"
+
+    def phonemize(self, lines: list[str], language: str) -> list[str]:
+        voice = _espeak_voice(language)
+        with self._lock:
+            sentences = [self._lib.phonemize_espeak(ln, voice) for ln in lines]
+        # Piper flattens the per-sentence phoneme lists into one sequence.
+        return ["".join("".join(s) for s in per_line) for per_line in sentences]
+
+
+class EspeakBackend:
+    """
+    Phonemizes through the espeak-ng CLI. Fallback for hosts without
+    piper-phonemize: it spawns one process per clause and only approximates
+    Piper's output (punctuation is re-attached between clauses).
+    """
+
+    name = "espeak"
+
+    def __init__(self) -> None:
+        exe = which("espeak-ng")
+        if exe is None:
+            raise RuntimeError(
+                "Missing dependency in PATH: espeak-ng\n"
+                "Install espeak-ng or set text.phonemize: false in your config."
+            )
+        self.exe = exe
+
+    def version(self) -> str:
+        out = run_output([self.exe, "--version"]).strip()
+        return out.split("Data at")[0].strip()
+
+    def _clause(self, text: str, voice: str) -> str:
+        # "--" so text starting with "-" is not parsed as an option.
+        ipa = run_output([self.exe, "-q", "--ipa", "-v", voice, "--", text])
+        return " ".join(ipa.split())
+
+    def phonemize(self, lines: list[str], language: str) -> list[str]:
+        voice = _espeak_voice(language)
+        out = []
+        for ln in lines:
+            # espeak-ng --ipa drops punctuation; phonemize clause by clause and put it back.
+            parts = []
+            for clause, punct in re.findall(r"([^.,;:!?]*)([.,;:!?]*)", ln):
+                ipa = self._clause(clause, voice) if clause.strip() else ""
+                if ipa or punct:
+                    parts.append(ipa + punct)
+            out.append(" ".join(parts))
+        return out
+
+
+_BACKENDS: dict[str, Callable[[], object]] = {
+    "piper": PiperBackend,
+    "espeak": EspeakBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[[], object]) -> None:
+    """
+    Registers a phonemizer backend.
+
+    `factory()` must return an object with `version() -> str` and
+    `phonemize(lines: list[str], language: str) -> list[str]`. Phonemization
+    runs in worker processes, so register backends at import time of a module
+    those processes also import.
+    """
+    _BACKENDS[name] = factory
+
+
+def get_backend(name: str):
+    if name not in _BACKENDS:
+        raise RuntimeError(f"Unknown phoneme backend: {name} (available: {', '.join(sorted(_BACKENDS))})")
+    return _BACKENDS[name]()
+
+
+# ---------------------------------------------------------------------------
+# Persistent cache
+# ---------------------------------------------------------------------------
+
+class TextCache:
+    """
+    SQLite cache of processed text keyed by (text, language, backend), where
+    backend is a name plus version string, e.g. "normalize:2" or "piper:1.2.0".
+    """
+
+    def __init__(self, path: Path) -> None:
+        ensure_dir(path.parent)
+        self.path = path
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " text TEXT NOT NULL, language TEXT NOT NULL, backend TEXT NOT NULL, result TEXT NOT NULL,"
+            " PRIMARY KEY (text, language, backend))"
+        )
+
+    def get_many(self, texts: Iterable[str], language: str, backend: str) -> dict[str, str]:
+        found: dict[str, str] = {}
+        for t in texts:
+            row = self.conn.execute(
+                "SELECT result FROM entries WHERE text = ? AND language = ? AND backend = ?",
+                (t, language, backend),
+            ).fetchone()
+            if row is not None:
+                found[t] = row[0]
+        return found
+
+    def put_many(self, items: dict[str, str], language: str, backend: str) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entries (text, language, backend, result) VALUES (?, ?, ?, ?)",
+                [(t, language, backend, r) for t, r in items.items()],
+            )
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Corpus stage
+# ---------------------------------------------------------------------------
+
+def _batches(items: list[str], size: int) -> list[list[str]]:
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# Phonemizer owned by a worker process (espeak-ng state is per process).
+_worker_backend = None
+
+
+def _init_phonemize_worker(backend_name: str) -> None:
+    global _worker_backend
+    _worker_backend = get_backend(backend_name)
+
+
+def _phonemize_batch(batch: list[str], language: str) -> list[str]:
+    return _worker_backend.phonemize(batch, language)
+
+
+def _cached_map(
+    cache: TextCache,
+    texts: list[str],
+    language: str,
+    backend_key: str,
+    run_batches: Callable[[list[list[str]]], Iterable[list[str]]],
+    batch_size: int,
+) -> tuple[dict[str, str], int]:
+    """Looks up `texts` in the cache and computes the misses batch by batch with `run_batches`."""
+    unique = list(dict.fromkeys(texts))
+    results = cache.get_many(unique, language, backend_key)
+    missing = [t for t in unique if t not in results]
+    if missing:
+        batches = _batches(missing, batch_size)
+        for batch, out in zip(batches, run_batches(batches)):
+            computed = dict(zip(batch, out))
+            cache.put_many(computed, language, backend_key)
+            results.update(computed)
+    return results, len(missing)
+
+
+def process_texts(cfg: SuiteConfig, texts: list[str]) -> tuple[list[str], Optional[list[str]]]:
+    """
+    Runs the text stage over a corpus.
+
+    Returns (normalized, phonemes) aligned with `texts`; phonemes is None when
+    `text.phonemize` is off. Both steps go through the persistent cache, so
+    sentences already seen (in this or any voice sharing the cache) are reused.
+    """
+    tcfg = cfg.text
+    language = cfg.language
+    cache = TextCache(tcfg.cache_path)
+    try:
+        if tcfg.normalize:
+            # Pure Python and cheap; not worth shipping to worker processes.
+            norm_map, n_norm = _cached_map(
+                cache, texts, language, f"normalize:{NORMALIZER_VERSION}",
+                lambda batches: ([normalize_text(t, language) for t in b] for b in batches),
+                tcfg.batch_size,
+            )
+            normalized = [norm_map[t] for t in texts]
+        else:
+            normalized, n_norm = list(texts), 0
+
+        phonemes: Optional[list[str]] = None
+        n_phon = 0
+        if tcfg.phonemize:
+            backend = get_backend(tcfg.phoneme_backend)
+
+            def run_batches(batches: list[list[str]]) -> Iterable[list[str]]:
+                # One phonemizer per worker process so batches really run in parallel.
+                with ProcessPoolExecutor(
+                    max_workers=max(1, min(tcfg.workers, len(batches))),
+                    initializer=_init_phonemize_worker,
+                    initargs=(tcfg.phoneme_backend,),
+                ) as pool:
+                    yield from pool.map(_phonemize_batch, batches, repeat(language))
+
+            phon_map, n_phon = _cached_map(
+                cache, normalized, language, f"{tcfg.phoneme_backend}:{backend.version()}",
+                run_batches, tcfg.batch_size,
+            )
+            phonemes = [phon_map[t] for t in normalized]
+    finally:
+        cache.close()
+
+    print(f"   text: {len(texts)} lines (normalized {n_norm} new, phonemized {n_phon} new; cache: {tcfg.cache_path})")
+    return normalized, phonemes
\ No newline at end of file
@@ -1,9 +1,27 @@
 from __future__ import annotations
 from pathlib import Path
 from .config import SuiteConfig
+from .storage import dataset_audio_index, is_packed_dataset, default_export_dir, export_wav_dataset, wav_export_is_current
 from .utils import run, ensure_dir
 
 
+def _training_dataset_dir(cfg: SuiteConfig) -> Path:
+    """
+    LJSpeech trainers expect wavs/<id>.wav. FLAC or packed datasets are decoded
+    to a plain WAV tree first (same as `pvs dataset export-wav`), unless an
+    export newer than the dataset already exists.
+    """
+    dataset_dir = cfg.paths.dataset_dir
+    # Checked first: listing a pack means decompressing all of it.
+    if not is_packed_dataset(dataset_dir) and all(n.endswith(".wav") for n in dataset_audio_index(dataset_dir).values()):
+        return dataset_dir
+    if wav_export_is_current(cfg):
+        print(f"ℹ️ Reusing up-to-date WAV export: {default_export_dir(cfg)}")
+        return default_export_dir(cfg)
+    print("ℹ️ Dataset audio is FLAC or packed; exporting a WAV copy for training")
+    return export_wav_dataset(cfg)
+
+
 def train_voice(cfg: SuiteConfig) -> Path:
     """
     Calls into an external training repo.
@@ -19,6 +37,8 @@ def train_voice(cfg: SuiteConfig) -> Path:
     ensure_dir(cfg.paths.work_dir)
     ensure_dir(cfg.paths.out_dir)
 
+    dataset_dir = _training_dataset_dir(cfg)
+
     # Output checkpoint dir
     ckpt_dir = cfg.paths.work_dir / "checkpoints" / cfg.voice_id
     ensure_dir(ckpt_dir)
@@ -35,7 +55,7 @@ def train_voice(cfg: SuiteConfig) -> Path:
     if train_py.exists():
         cmd = [
             "python", str(train_py),
-            "--dataset", str(cfg.paths.dataset_dir),
+            "--dataset", str(dataset_dir),
             "--voice-id", cfg.voice_id,
             "--epochs", str(cfg.training.epochs),
             "--batch-size", str(cfg.training.batch_size),
@@ -46,7 +66,7 @@ def train_voice(cfg: SuiteConfig) -> Path:
     elif train_sh.exists():
         cmd = [
             "bash", str(train_sh),
-            str(cfg.paths.dataset_dir),
+            str(dataset_dir),
             cfg.voice_id,
             str(cfg.training.epochs),
             str(cfg.training.batch_size),
@@ -33,6 +33,20 @@ def run(cmd: list[str], cwd: Path | None = None, env: dict[str, str] | None = No
     print(proc.stdout)
 
 
+def run_output(cmd: list[str], cwd: Path | None = None) -> str:
+    proc = subprocess.run(
+        cmd,
+        cwd=str(cwd) if cwd else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=False,
+    )
+    if proc.returncode != 0:
+        raise CmdError(f"Command failed ({proc.returncode}): {' '.join(cmd)}\n\n{proc.stderr}")
+    return proc.stdout
+
+
 def write_text(path: Path, text: str) -> None:
     path.write_text(text, encoding="utf-8")
 
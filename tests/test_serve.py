@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+
+from piper_voice_suite.serve import AudioCache, MicroBatcher, VoiceModel
+
+KNOBS = (0.667, 1.0, 0.8, 0)
+
+
+def _model(phoneme_id_map=None, num_speakers=1, has_sid=False):
+    # Skip __init__: these tests cover the pure-Python parts and need no onnxruntime session.
+    model = VoiceModel.__new__(VoiceModel)
+    model.phoneme_id_map = phoneme_id_map or {"^": [1], "_": [0], "$": [2]}
+    model.num_speakers = num_speakers
+    model._has_sid = has_sid
+    return model
+
+
+def test_audio_cache_evicts_least_recently_used_by_bytes():
+    cache = AudioCache(max_bytes=10)
+    cache.put(("a", KNOBS), b"aaaa")
+    cache.put(("b", KNOBS), b"bbbb")
+    assert cache.get(("a", KNOBS)) == b"aaaa"  # "a" is now most recent
+
+    cache.put(("c", KNOBS), b"cccc")
+    assert cache.get(("b", KNOBS)) is None
+    assert cache.get(("a", KNOBS)) == b"aaaa"
+    assert cache.get(("c", KNOBS)) == b"cccc"
+    assert cache.stats()["bytes"] == 8
+
+
+def test_audio_cache_skips_oversized_items():
+    cache = AudioCache(max_bytes=4)
+    cache.put(("a", KNOBS), b"aa")
+    cache.put(("big", KNOBS), b"x" * 5)
+    assert cache.get(("big", KNOBS)) is None
+    assert cache.get(("a", KNOBS)) == b"aa"
+
+
+def test_audio_cache_keys_on_knobs():
+    cache = AudioCache(max_bytes=100)
+    cache.put(("a", KNOBS), b"default")
+    assert cache.get(("a", (0.667, 1.5, 0.8, 0))) is None
+
+
+@pytest.mark.parametrize(
+    "knobs, num_speakers, has_sid, ok",
+    [
+        (KNOBS, 1, False, True),
+        ((0.667, 0.0, 0.8, 0), 1, False, False),
+        ((0.667, -1.0, 0.8, 0), 1, False, False),
+        ((-0.1, 1.0, 0.8, 0), 1, False, False),
+        ((0.667, 1.0, 0.8, 1), 1, False, False),
+        ((0.667, 1.0, 0.8, 3), 4, True, True),
+        ((0.667, 1.0, 0.8, 4), 4, True, False),
+        ((0.667, 1.0, 0.8, -1), 4, True, False),
+    ],
+)
+def test_check_knobs(knobs, num_speakers, has_sid, ok):
+    model = _model(num_speakers=num_speakers, has_sid=has_sid)
+    assert (model.check_knobs(knobs) is None) == ok
+
+
+def test_phoneme_ids_layout():
+    model = _model({"^": [1], "_": [0], "$": [2], "a": [5], "b": [6, 7], ",": [8]})
+    # BOS, PAD, then each known phoneme followed by PAD, then EOS; unknown phonemes are skipped.
+    assert model._phoneme_ids("a?b,") == [1, 0, 5, 0, 6, 7, 0, 8, 0, 2]
+    assert model._phoneme_ids("") == [1, 0, 2]
+
+
+class _StubModel:
+    session_count = 2
+
+    def __init__(self):
+        self.calls = []
+
+    def infer(self, ids, knobs):
+        self.calls.append((tuple(ids), knobs))
+        return bytes(ids)
+
+
+def test_micro_batcher_collapses_duplicate_keys():
+    model = _StubModel()
+    cache = AudioCache(max_bytes=1000)
+    batcher = MicroBatcher(model, cache, max_batch=8, wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit(("a.", KNOBS), [1, 2]),
+            batcher.submit(("a.", KNOBS), [1, 2]),
+            batcher.submit(("b.", KNOBS), [3]),
+        )
+
+    results = asyncio.run(run())
+    assert results == [b"\x01\x02", b"\x01\x02", b"\x03"]
+    assert sorted(model.calls) == [((1, 2), KNOBS), ((3,), KNOBS)]
+    assert cache.get(("a.", KNOBS)) == b"\x01\x02"
\ No newline at end of file
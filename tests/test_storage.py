@@ -0,0 +1,108 @@
+import dataclasses
+import os
+import struct
+from pathlib import Path
+
+import pytest
+
+from piper_voice_suite.config import load_config
+
+from piper_voice_suite.storage import (
+    EXPORT_STAMP,
+    PACK_NAME,
+    _wav_pcm_info,
+    dataset_audio_index,
+    iter_dataset_audio,
+    iter_pack,
+    list_pack,
+    pack_dir,
+    wav_export_is_current,
+)
+
+EXAMPLE_CONFIG = Path(__file__).resolve().parent.parent / "examples" / "voice_config.yaml"
+
+
+def _streamed_wav(pcm: bytes, sample_rate: int = 22050) -> bytes:
+    # Header as ffmpeg writes it to a pipe: RIFF/data sizes unset, plus a LIST chunk.
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+        + b"LIST" + struct.pack("<I", 4) + b"INFO"
+        + b"data" + struct.pack("<I", 0xFFFFFFFF) + pcm
+    )
+
+
+def test_wav_pcm_info_ignores_unset_sizes():
+    assert _wav_pcm_info(_streamed_wav(b"\0\0" * 100)) == (200, 44100)
+
+
+def test_wav_pcm_info_without_data_chunk():
+    assert _wav_pcm_info(_streamed_wav(b"")[:-8]) == (0, 44100)
+
+
+def test_dataset_audio_index_loose(tmp_path):
+    wavs = tmp_path / "wavs"
+    wavs.mkdir()
+    (wavs / "000001.wav").write_bytes(b"a")
+    (wavs / "000002.flac").write_bytes(b"b")
+    (wavs / "notes.txt").write_text("ignored")
+    assert dataset_audio_index(tmp_path) == {"000001": "000001.wav", "000002": "000002.flac"}
+
+
+def test_dataset_audio_index_missing(tmp_path):
+    with pytest.raises(RuntimeError, match="Neither"):
+        dataset_audio_index(tmp_path)
+
+
+def test_dataset_audio_index_rejects_both_layouts(tmp_path):
+    (tmp_path / "wavs").mkdir()
+    (tmp_path / PACK_NAME).write_bytes(b"")
+    with pytest.raises(RuntimeError, match="Both"):
+        dataset_audio_index(tmp_path)
+
+
+def test_pack_round_trip(tmp_path):
+    pytest.importorskip("zstandard")
+    src = tmp_path / "src"
+    src.mkdir()
+    files = {"000001.flac": b"fLaC" + b"\1" * 1000, "000002.flac": b"fLaC" + b"\2" * 10, "000003.wav": b"RIFF"}
+    for name, data in files.items():
+        (src / name).write_bytes(data)
+
+    pack = pack_dir(src, tmp_path / PACK_NAME)
+    assert sorted(list_pack(pack)) == sorted(files)
+    assert dict(iter_pack(pack)) == files
+
+
+def test_dataset_audio_index_packed(tmp_path):
+    pytest.importorskip("zstandard")
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "000001.flac").write_bytes(b"one")
+    (src / "000002.flac").write_bytes(b"two")
+    dataset = tmp_path / "dataset"
+    dataset.mkdir()
+    pack_dir(src, dataset / PACK_NAME)
+
+    assert dataset_audio_index(dataset) == {"000001": "000001.flac", "000002": "000002.flac"}
+    assert dict(iter_dataset_audio(dataset)) == {"000001": b"one", "000002": b"two"}
+
+
+def test_wav_export_is_current(tmp_path):
+    cfg = load_config(EXAMPLE_CONFIG)
+    dataset = tmp_path / "dataset"
+    cfg = dataclasses.replace(cfg, paths=dataclasses.replace(cfg.paths, dataset_dir=dataset))
+    (dataset / "wavs").mkdir(parents=True)
+    (dataset / "metadata.csv").write_text("000001|a|a\n")
+    stamp = tmp_path / "dataset_wav" / EXPORT_STAMP
+    assert not wav_export_is_current(cfg)
+
+    stamp.parent.mkdir()
+    stamp.write_text("1\n")
+    os.utime(dataset / "metadata.csv", (1000, 1000))
+    os.utime(dataset / "wavs", (1000, 1000))
+    os.utime(stamp, (2000, 2000))
+    assert wav_export_is_current(cfg)
+
+    os.utime(dataset / "metadata.csv", (3000, 3000))
+    assert not wav_export_is_current(cfg)
\ No newline at end of file
@@ -0,0 +1,32 @@
+import pytest
+
+from piper_voice_suite.text import normalize_text
+
+
+@pytest.mark.parametrize(
+    "language, text, expected",
+    [
+        ("en_US", "The year 1999", "The year nineteen ninety-nine."),
+        ("en_US", "Back in 1905 and 2005", "Back in nineteen oh five and two thousand five."),
+        ("en_US", "It was 1900 or 2010", "It was nineteen hundred or twenty ten."),
+        ("en_US", "10:30 am", "ten thirty a m."),
+        ("en_US", "at 3:45pm", "at three forty-five p m."),
+        ("en_US", "9:05PM sharp", "nine oh five p m sharp."),
+        ("en_US", "4:00pm", "four p m."),
+        ("en_US", "Call 555-1234", "Call five five five, one two three four."),
+        ("en_US", "Codes 1234 5678", "Codes one thousand two hundred thirty-four five thousand six hundred seventy-eight."),
+        ("en_US", "Meet at 7:05 or 9:00", "Meet at seven oh five or nine o'clock."),
+        ("en_US", "The 1,000th visitor", "The one thousandth visitor."),
+        ("en_US", "The 21st and 3rd", "The twenty-first and third."),
+        ("en_US", "about 1,2 things", "about one, two things."),
+        ("en_US", "It has 1,234,567 rows", "It has one million two hundred thirty-four thousand five hundred sixty-seven rows."),
+        ("en_US", "Main St.", "Main St."),
+        ("en_US", "Dr. Smith paid $3.50", "doctor Smith paid three dollars and fifty cents."),
+        ("en_US", "-5 degrees", "minus five degrees."),
+        ("en_US", "Version 3.14 is 15% faster", "Version three point one four is fifteen percent faster."),
+        ("en_US", "“Wait” — she said…", "\"Wait\", she said..."),
+        ("de_DE", "Es kostet 1,5 Euro", "Es kostet 1,5 Euro."),
+    ],
+)
+def test_normalize_text(language, text, expected):
+    assert normalize_text(text, language) == expected
\ No newline at end of file